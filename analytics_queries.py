@@ -7,6 +7,7 @@ to extract meaningful business insights.
 
 import sqlite3
 import csv
+from itertools import chain
 from pathlib import Path
 import logging
 
@@ -17,8 +18,108 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Maximum width of a column in printed result tables
+MAX_COL_WIDTH = 25
 
-def execute_query(cursor, query, description):
+# Rows fetched per fetchmany call when streaming results with fixed widths
+FETCH_SIZE = 1000
+
+
+# Multi-table JOIN query: Complete order analysis with all related tables.
+# Kept as a constant string so sqlite3's statement cache reuses the plan;
+# the same full-width result is printed (truncated in Python) and exported.
+#
+# The recent CTE applies the limit to orders before joining, so join work
+# scales with the limit instead of the size of the orders table. The outer
+# LIMIT still caps line items; both match the original query as long as
+# each of the most recent orders has at least one line item and a user.
+ORDER_DETAILS_QUERY = """
+    WITH recent AS (
+        SELECT *
+        FROM orders
+        ORDER BY order_date DESC, order_id
+        LIMIT :limit
+    )
+    SELECT 
+        o.order_id,
+        o.order_date,
+        u.name AS customer_name,
+        u.email,
+        u.city,
+        u.state,
+        pr.name AS product_name,
+        pr.category,
+        oi.quantity,
+        oi.price AS unit_price,
+        (oi.quantity * oi.price) AS item_total,
+        o.total_amount AS order_total,
+        o.status AS order_status,
+        p.payment_method,
+        p.payment_date,
+        p.status AS payment_status
+    FROM recent o
+    INNER JOIN users u ON o.user_id = u.user_id
+    INNER JOIN order_items oi ON o.order_id = oi.order_id
+    INNER JOIN products pr ON oi.product_id = pr.product_id
+    LEFT JOIN payments p ON o.order_id = p.order_id
+    ORDER BY o.order_date DESC, o.order_id, oi.order_item_id
+    LIMIT :limit;
+"""
+
+# Maximum number of recent orders joined and line items returned by ORDER_DETAILS_QUERY
+ORDER_DETAILS_LIMIT = 50
+
+_connection = None
+_connection_path = None
+
+
+def get_conn(db_path):
+    """
+    Return a shared read-only connection to the database.
+    
+    The connection is created on first use and reused afterwards, so
+    repeated queries hit sqlite3's prepared statement cache.
+    
+    Args:
+        db_path: Path to the SQLite database file
+        
+    Returns:
+        sqlite3.Connection: Shared connection object
+    """
+    global _connection, _connection_path
+    
+    if _connection is not None and _connection_path != db_path:
+        close_conn()
+    
+    if _connection is None:
+        _connection = sqlite3.connect(db_path, cached_statements=256, isolation_level=None)
+        
+        # Tune for read-heavy JOIN probes: memory-map the file so reads come
+        # straight from the page cache, and keep a large page cache
+        _connection.execute("PRAGMA mmap_size = 1073741824")
+        _connection.execute("PRAGMA cache_size = -200000")
+        _connection.execute("PRAGMA temp_store = MEMORY")
+        _connection.execute("PRAGMA query_only = ON")
+        _connection_path = db_path
+        logger.info(f"Connected to database: {db_path}")
+    
+    return _connection
+
+
+def close_conn():
+    """
+    Close the shared connection opened by get_conn, if any.
+    """
+    global _connection, _connection_path
+    
+    if _connection is not None:
+        _connection.close()
+        _connection = None
+        _connection_path = None
+        logger.info("Database connection closed")
+
+
+def execute_query(cursor, query, description, params=(), col_widths=None):
     """
     Execute a query and display results in a formatted table.
     
@@ -26,57 +127,83 @@ def execute_query(cursor, query, description):
         cursor: SQLite cursor object
         query: SQL query string
         description: Description of the query
+        params: Parameters bound to the query placeholders
+        col_widths: Optional fixed column widths. When given, rows are
+            streamed with fetchmany instead of loading the whole result
+            
+    Returns:
+        tuple: (columns, rows) of the full, untruncated result, or None if
+            the query failed or the rows were streamed
     """
     print("\n" + "="*100)
     print(f"QUERY: {description}")
     print("="*100)
     
     try:
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        
-        if not rows:
-            print("No results found.")
-            return
+        cursor.execute(query, params)
         
         # Get column names
         columns = [desc[0] for desc in cursor.description]
+        rows = None
         
-        # Calculate column widths (max 25 chars per column for readability)
-        col_widths = []
-        for i, col in enumerate(columns):
-            max_width = len(col)
-            for row in rows:
-                val_len = len(str(row[i]))
-                max_width = max(max_width, val_len)
-            # Cap width at 25 for very long fields
-            col_widths.append(min(max_width, 25))
-        
-        # Print header with box drawing
-        header_parts = []
-        for i, col in enumerate(columns):
-            header_parts.append(col[:col_widths[i]].ljust(col_widths[i]))
+        if col_widths is None:
+            # Widths are sized from the data, so the full result is needed
+            rows = cursor.fetchall()
+            
+            if not rows:
+                print("No results found.")
+                return columns, rows
+            
+            # Convert each value to a truncated string once, then size columns
+            # from those strings (max MAX_COL_WIDTH chars for readability)
+            str_rows = [[str(val)[:MAX_COL_WIDTH] for val in row] for row in rows]
+            col_widths = [
+                max(min(len(col), MAX_COL_WIDTH), *(len(row[i]) for row in str_rows))
+                for i, col in enumerate(columns)
+            ]
+            batches = [str_rows]
+        else:
+            if len(col_widths) != len(columns):
+                logger.error(
+                    f"Query failed: {len(col_widths)} column widths given "
+                    f"for {len(columns)} columns"
+                )
+                return None
+            
+            first_batch = cursor.fetchmany(FETCH_SIZE)
+            
+            if not first_batch:
+                print("No results found.")
+                return None
+            
+            batches = chain([first_batch], iter(lambda: cursor.fetchmany(FETCH_SIZE), []))
         
+        # Prebuilt format string pads and truncates each cell to its width
+        row_format = "| " + " | ".join(f"{{:<{w}.{w}}}" for w in col_widths) + " |"
         border = "+" + "+".join("-" * (w + 2) for w in col_widths) + "+"
-        header = "| " + " | ".join(header_parts) + " |"
         
+        # Print header with box drawing
         print("\n" + border)
-        print(header)
+        print(row_format.format(*columns))
         print(border)
         
         # Print rows
-        for row in rows:
-            row_parts = []
-            for i, val in enumerate(row):
-                val_str = str(val)[:col_widths[i]].ljust(col_widths[i])
-                row_parts.append(val_str)
-            print("| " + " | ".join(row_parts) + " |")
+        total_rows = 0
+        for batch in batches:
+            for row in batch:
+                print(row_format.format(*map(str, row)))
+            total_rows += len(batch)
         
         print(border)
-        print(f"\nTotal rows: {len(rows)}\n")
+        print(f"\nTotal rows: {total_rows}\n")
+        
+        if rows is None:
+            return None
+        return columns, rows
         
     except sqlite3.Error as e:
         logger.error(f"Query failed: {str(e)}")
+        return None
 
 
 def run_queries():
@@ -92,45 +219,18 @@ def run_queries():
         return
     
     try:
-        # Connect to database
-        conn = sqlite3.connect(db_path)
+        # Reuse the shared connection so the JOIN plan stays cached
+        conn = get_conn(db_path)
         cursor = conn.cursor()
-        logger.info(f"Connected to database: {db_path}")
+        params = {'limit': ORDER_DETAILS_LIMIT}
         
-        # Multi-table JOIN query: Complete order analysis with all related tables
-        query = """
-        SELECT 
-            o.order_id,
-            o.order_date,
-            u.name AS customer_name,
-            u.email,
-            u.city,
-            u.state,
-            pr.name AS product_name,
-            pr.category,
-            oi.quantity,
-            oi.price AS unit_price,
-            (oi.quantity * oi.price) AS item_total,
-            o.total_amount AS order_total,
-            o.status AS order_status,
-            p.payment_method,
-            p.payment_date,
-            p.status AS payment_status
-        FROM orders o
-        INNER JOIN users u ON o.user_id = u.user_id
-        INNER JOIN order_items oi ON o.order_id = oi.order_id
-        INNER JOIN products pr ON oi.product_id = pr.product_id
-        LEFT JOIN payments p ON o.order_id = p.order_id
-        ORDER BY o.order_date DESC, o.order_id, oi.order_item_id
-        LIMIT 50;
-        """
-        execute_query(cursor, query, "Complete Order Details - Multi-Table JOIN")
+        # Run the JOIN once: truncated for printing, full width for the CSV
+        result = execute_query(cursor, ORDER_DETAILS_QUERY, "Complete Order Details - Multi-Table JOIN", params)
+        if result is None:
+            return
+        columns, rows = result
         
         # Save results to CSV
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        columns = [desc[0] for desc in cursor.description]
-        
         with open(output_csv, 'w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
             writer.writerow(columns)
@@ -144,12 +244,10 @@ def run_queries():
     
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-    
-    finally:
-        if conn:
-            conn.close()
-            logger.info("Database connection closed")
 
 
 if __name__ == "__main__":
-    run_queries()
+    try:
+        run_queries()
+    finally:
+        close_conn()
@@ -7,9 +7,19 @@ from the data directory into corresponding tables.
 
 import sqlite3
 import csv
+import multiprocessing
+import os
+import re
+import tempfile
+from itertools import islice
 from pathlib import Path
 import logging
 
+try:
+    import apsw  # Optional: lower per-row overhead than sqlite3 for bulk inserts
+except ImportError:
+    apsw = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -17,40 +27,114 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rows passed to each executemany call when loading through Python
+BATCH_SIZE = 10_000
+
+# Rows sampled to decide whether a table's key column holds integers
+KEY_SAMPLE_SIZE = 100
+
+# Values SQLite accepts for an INTEGER PRIMARY KEY. Unlike int(), this rejects
+# '1_000' and non-ASCII digits, and it avoids a raised ValueError per value.
+INTEGER_PATTERN = re.compile(r'\s*[-+]?[0-9]+\s*', re.ASCII)
+
+# Columns stored with NUMERIC affinity. Every other non-key column is TEXT, so
+# codes such as phone numbers and pincodes keep their leading zeros.
+NUMERIC_COLUMNS = {
+    'orders': {'user_id', 'total_amount'},
+    'order_items': {'order_id', 'product_id', 'quantity', 'price'},
+    'payments': {'order_id', 'amount'},
+    'products': {'price', 'stock'},
+}
+
+# SQLite's default limit on databases attached to one connection
+MAX_ATTACHED = 10
 
-def infer_column_type(values):
+# Errors raised by the SQLite bindings used for scratch databases
+SQLITE_ERRORS = (sqlite3.Error, apsw.Error) if apsw is not None else (sqlite3.Error,)
+
+# Indexes on join/sort columns used by analytics_queries.py: (name, table, columns)
+INDEXES = [
+    ('idx_oi_order', 'order_items', 'order_id'),
+    ('idx_oi_product', 'order_items', 'product_id'),
+    ('idx_p_order', 'payments', 'order_id'),
+    ('idx_o_user', 'orders', 'user_id'),
+    ('idx_o_date', 'orders', 'order_date DESC'),
+]
+
+
+def chunked(iterable, size):
     """
-    Infer SQLite data type from sample values.
+    Split an iterable into lists of at most size items.
     
     Args:
-        values: List of sample values from the column
+        iterable: Any iterable, consumed lazily
+        size: Maximum number of items per chunk
+        
+    Yields:
+        list: Next chunk of items
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def infer_columns(table_name, csv_file):
+    """
+    Work out column definitions for a table from its CSV structure.
+    
+    Column types come from NUMERIC_COLUMNS instead of being inferred from
+    every column; only the primary key is checked against sample rows so
+    integer keys become rowid aliases and other keys stay TEXT.
+    
+    Args:
+        table_name: Name of the table
+        csv_file: Path to CSV file
         
     Returns:
-        str: SQLite data type
+        list: (name, type, is_primary_key) tuples in CSV column order
     """
-    # Remove empty values
-    values = [v for v in values if v]
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        headers = next(reader)
+        sample_rows = list(islice(reader, KEY_SAMPLE_SIZE))
     
-    if not values:
-        return 'TEXT'
+    numeric_columns = NUMERIC_COLUMNS.get(table_name, set())
     
-    # Check if all values are integers
-    try:
-        for val in values:
-            int(val)
-        return 'INTEGER'
-    except ValueError:
-        pass
+    columns = []
+    for i, col in enumerate(headers):
+        # Add PRIMARY KEY constraint for ID columns
+        if col.endswith('_id') and col.startswith(table_name[:-1]):
+            key_values = [row[i] for row in sample_rows if i < len(row) and row[i]]
+            if key_values and all(INTEGER_PATTERN.fullmatch(v) for v in key_values):
+                columns.append((col, 'INTEGER', True))
+            else:
+                columns.append((col, 'TEXT', True))
+        elif col in numeric_columns:
+            columns.append((col, 'NUMERIC', False))
+        else:
+            columns.append((col, 'TEXT', False))
     
-    # Check if all values are floats
-    try:
-        for val in values:
-            float(val)
-        return 'REAL'
-    except ValueError:
-        pass
+    return columns
+
+
+def create_table(cursor, table_name, columns):
+    """
+    Create a table from column definitions.
     
-    return 'TEXT'
+    Args:
+        cursor: SQLite cursor object
+        table_name: Name of the table to create
+        columns: (name, type, is_primary_key) tuples from infer_columns
+    """
+    column_defs = [
+        f"{name} {sql_type} PRIMARY KEY" if is_key else f"{name} {sql_type}"
+        for name, sql_type, is_key in columns
+    ]
+    create_statement = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(column_defs)})"
+    cursor.execute(create_statement)
 
 
 def create_table_from_csv(cursor, table_name, csv_file):
@@ -63,36 +147,208 @@ def create_table_from_csv(cursor, table_name, csv_file):
         csv_file: Path to CSV file
         
     Returns:
-        tuple: (headers, sample_rows) for later insertion
+        list: (name, type, is_primary_key) tuples in CSV column order
+    """
+    columns = infer_columns(table_name, csv_file)
+    create_table(cursor, table_name, columns)
+    
+    return columns
+
+
+def reset_table(cursor, table_name, columns):
+    """
+    Prepare a table for reload, reusing its schema when it matches the CSV.
+    
+    Args:
+        cursor: SQLite cursor object
+        table_name: Name of the table in the main database
+        columns: (name, type, is_primary_key) tuples from infer_columns
+    """
+    # Compare names, declared types and primary key, not just names, so a
+    # table with stale types or key type is rebuilt instead of reused
+    cursor.execute(f"PRAGMA main.table_info({table_name})")
+    existing_columns = [
+        (row[1], row[2].upper(), bool(row[5])) for row in cursor.fetchall()
+    ]
+    
+    if existing_columns == columns:
+        # DELETE without WHERE uses SQLite's truncate optimization and keeps
+        # the table's indexes and statistics in place
+        cursor.execute(f"DELETE FROM main.{table_name}")
+        logger.info(f"Cleared table: {table_name}")
+    else:
+        # Table is missing or its schema changed, so rebuild it
+        cursor.execute(f"DROP TABLE IF EXISTS main.{table_name}")
+        create_table(cursor, table_name, columns)
+        logger.info(f"Created table: {table_name}")
+
+
+def create_indexes(cursor):
+    """
+    Create indexes on foreign key and sort columns, then refresh planner stats.
+    
+    Args:
+        cursor: SQLite cursor object
+    """
+    cursor.execute("SELECT name FROM main.sqlite_master WHERE type = 'index'")
+    existing_indexes = {row[0] for row in cursor.fetchall()}
+    
+    for index_name, table_name, columns in INDEXES:
+        if index_name in existing_indexes:
+            # Kept from a previous load because the table was reused
+            logger.info(f"Index already exists: {index_name}")
+            continue
+        
+        try:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({columns})")
+            logger.info(f"Created index: {index_name} on {table_name}({columns})")
+        except sqlite3.Error as e:
+            # Table may be missing if its CSV was absent or failed to load
+            logger.warning(f"Skipping index {index_name}: {str(e)}")
+    
+    # Collect statistics so the query planner can use the new indexes
+    cursor.execute("ANALYZE")
+
+
+def load_csv_extension(conn):
+    """
+    Try to load SQLite's csv virtual table extension.
+
+    Args:
+        conn: SQLite connection object (sqlite3 or apsw)
+
+    Returns:
+        bool: True if the extension was loaded, False otherwise
+    """
+    try:
+        conn.enable_load_extension(True)
+        try:
+            conn.load_extension('csv')
+        finally:
+            conn.enable_load_extension(False)
+    except (AttributeError, *SQLITE_ERRORS) as e:
+        # Python built without extension support, or extension not installed
+        logger.debug(f"CSV extension unavailable, using Python loader: {str(e)}")
+        return False
+
+    logger.debug("Loaded SQLite csv extension for native CSV import")
+    return True
+
+
+def insert_csv_native(cursor, table_name, csv_file):
     """
+    Insert CSV rows using SQLite's csv virtual table, parsing in C.
+
+    Args:
+        cursor: SQLite cursor object
+        table_name: Name of the table to insert into
+        csv_file: Path to CSV file
+
+    Returns:
+        int: Number of rows inserted
+    """
+    # Virtual table arguments cannot be bound as parameters
+    filename = str(csv_file).replace("'", "''")
+    cursor.execute(
+        f"CREATE VIRTUAL TABLE temp.csv_in USING csv(filename='{filename}', header=YES)"
+    )
+    try:
+        cursor.execute(f"INSERT INTO {table_name} SELECT * FROM temp.csv_in")
+        # changes() works for both sqlite3 and apsw cursors
+        cursor.execute("SELECT changes()")
+        inserted = cursor.fetchone()[0]
+    finally:
+        cursor.execute("DROP TABLE temp.csv_in")
+
+    return inserted
+
+
+def insert_csv_rows(cursor, table_name, headers, csv_file):
+    """
+    Insert CSV rows by parsing them in Python and batching executemany calls.
+
+    Args:
+        cursor: SQLite cursor object
+        table_name: Name of the table to insert into
+        headers: Column names in table order
+        csv_file: Path to CSV file
+
+    Returns:
+        int: Number of rows inserted
+    """
+    placeholders = ', '.join(['?' for _ in headers])
+    insert_statement = f"INSERT INTO {table_name} VALUES ({placeholders})"
+
     with open(csv_file, 'r', encoding='utf-8') as f:
         reader = csv.reader(f)
-        headers = next(reader)
+        next(reader)  # Skip header row
+
+        # Table columns are created from the CSV headers, so rows are
+        # already in insert order. Like csv.DictReader, skip blank lines,
+        # pad short rows with NULLs and ignore extra trailing fields.
+        column_count = len(headers)
+        rows = (
+            row if len(row) == column_count
+            else (row + [None] * column_count)[:column_count]
+            for row in reader if row
+        )
         
-        # Read sample rows to infer types
-        sample_rows = []
-        for i, row in enumerate(reader):
-            sample_rows.append(row)
-            if i >= 100:  # Sample first 100 rows
-                break
+        # Fixed-size batches keep memory bounded on large files
+        inserted = 0
+        for batch in chunked(rows, BATCH_SIZE):
+            cursor.executemany(insert_statement, batch)
+            inserted += len(batch)
+
+    return inserted
+
+
+def ingest_csv_to_temp_db(csv_file, tmp_db):
+    """
+    Parse one CSV file into its own scratch database (runs in a worker process).
     
-    # Infer column types
-    columns = []
-    for i, col in enumerate(headers):
-        sample_values = [row[i] for row in sample_rows if i < len(row)]
-        sql_type = infer_column_type(sample_values)
+    Uses apsw for the scratch connection when it is installed, since it binds
+    parameters with less overhead than sqlite3; otherwise falls back to sqlite3.
+    
+    Args:
+        csv_file: Path to CSV file
+        tmp_db: Path of the scratch database to create
+    
+    Returns:
+        tuple: (rows inserted, column definitions, None) on success,
+            (None, None, error message) on failure
+    """
+    table_name = csv_file.stem
+    logger.info(f"Processing {csv_file.name}...")
+    
+    if apsw is not None:
+        conn = apsw.Connection(str(tmp_db))
+    else:
+        conn = sqlite3.connect(tmp_db)
+    
+    try:
+        cursor = conn.cursor()
         
-        # Add PRIMARY KEY constraint for ID columns
-        if col.endswith('_id') and col.startswith(table_name[:-1]):
-            columns.append(f"{col} {sql_type} PRIMARY KEY")
-        else:
-            columns.append(f"{col} {sql_type}")
+        # Scratch database is discarded after copying, so skip durability
+        cursor.execute("PRAGMA journal_mode = OFF")
+        cursor.execute("PRAGMA synchronous = OFF")
+        
+        # Both bindings commit on successful exit and roll back on error
+        with conn:
+            columns = create_table_from_csv(cursor, table_name, csv_file)
+            headers = [name for name, _, _ in columns]
+            
+            if load_csv_extension(conn):
+                inserted = insert_csv_native(cursor, table_name, csv_file)
+            else:
+                inserted = insert_csv_rows(cursor, table_name, headers, csv_file)
+        
+        return inserted, columns, None
     
-    create_statement = f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})"
-    cursor.execute(create_statement)
-    logger.info(f"Created table: {table_name}")
+    except Exception as e:
+        return None, None, str(e)
     
-    return headers
+    finally:
+        conn.close()
 
 
 def load_csv_to_sqlite(data_dir='data', db_name='ecommerce.db'):
@@ -122,70 +378,107 @@ def load_csv_to_sqlite(data_dir='data', db_name='ecommerce.db'):
     
     logger.info(f"Found {len(csv_files)} CSV file(s) to process")
     
+    conn = None
+    
     try:
-        # Connect to SQLite database (creates if doesn't exist)
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Enable foreign key constraints
-        cursor.execute("PRAGMA foreign_keys = ON")
-        
-        logger.info(f"Connected to database: {db_path}")
-        
-        # Process each CSV file
-        for csv_file in csv_files:
-            table_name = csv_file.stem  # Get filename without extension
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Parse CSV files in parallel, each into its own scratch database.
+            # This runs before the main connection is opened, since SQLite
+            # connections must not be carried across fork().
+            tmp_dbs = [Path(tmp_dir) / f"{csv_file.stem}.db" for csv_file in csv_files]
+            processes = min(os.cpu_count() or 1, len(csv_files))
+            logger.info(f"Parsing CSV files with {processes} worker process(es)")
             
-            try:
-                logger.info(f"Processing {csv_file.name}...")
-                
-                # Drop table if exists (for clean reload)
-                cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(ingest_csv_to_temp_db, zip(csv_files, tmp_dbs))
+            
+            loaded = []
+            for csv_file, tmp_db, (inserted, columns, error) in zip(csv_files, tmp_dbs, results):
+                if error is not None:
+                    logger.error(f"Error processing {csv_file.name}: {error}")
+                else:
+                    loaded.append((csv_file, tmp_db, inserted, columns))
+            
+            # Connect to SQLite database (creates if doesn't exist)
+            conn = sqlite3.connect(db_path)
+            cursor = conn.cursor()
+            
+            # Enable foreign key constraints
+            cursor.execute("PRAGMA foreign_keys = ON")
+            
+            # Larger pages mean fewer reads per JOIN probe. Only takes effect on a
+            # new, empty database and must be set before switching to WAL.
+            cursor.execute("PRAGMA page_size = 8192")
+            
+            # Tune connection for bulk loading: WAL journal, fewer fsyncs,
+            # larger page cache and in-memory temp storage
+            cursor.execute("PRAGMA journal_mode = WAL")
+            cursor.execute("PRAGMA synchronous = NORMAL")
+            cursor.execute("PRAGMA cache_size = -200000")
+            cursor.execute("PRAGMA temp_store = MEMORY")
+            cursor.execute("PRAGMA mmap_size = 268435456")
+            
+            logger.info(f"Connected to database: {db_path}")
+            
+            # Copy scratch tables into the main database, attaching as many
+            # scratch databases as SQLite allows per transaction
+            for group in chunked(loaded, MAX_ATTACHED):
+                # ATTACH is not allowed inside a transaction
+                for i, (csv_file, tmp_db, _, _) in enumerate(group):
+                    cursor.execute(f"ATTACH DATABASE ? AS src{i}", (str(tmp_db),))
                 
-                # Create table and get headers
-                headers = create_table_from_csv(cursor, table_name, csv_file)
+                # Load the group in a single transaction so there is only one commit
+                cursor.execute("BEGIN")
                 
-                # Read and insert data
-                with open(csv_file, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    rows = list(reader)
+                for i, (csv_file, tmp_db, inserted, columns) in enumerate(group):
+                    table_name = csv_file.stem  # Get filename without extension
                     
-                    if not rows:
-                        logger.warning(f"Skipping {csv_file.name} - file is empty")
+                    try:
+                        # Savepoint lets a failed file be undone without losing the others
+                        cursor.execute("SAVEPOINT load_file")
+                        
+                        # Empty or create the table (for clean reload), using the
+                        # schema the worker already inferred from the CSV
+                        reset_table(cursor, table_name, columns)
+                        
+                        # Single C-level copy from the scratch database; row count
+                        # comes from the worker that parsed the file
+                        cursor.execute(f"INSERT INTO main.{table_name} SELECT * FROM src{i}.{table_name}")
+                        
+                        if inserted <= 0:
+                            logger.warning(f"Skipping {csv_file.name} - file is empty")
+                        else:
+                            logger.info(f"Loaded {inserted} rows from {csv_file.name}")
+                            
+                            # Verify insertion
+                            cursor.execute(f"SELECT COUNT(*) FROM main.{table_name}")
+                            count = cursor.fetchone()[0]
+                            logger.info(f"Successfully inserted {count} rows into '{table_name}'")
+                        
+                        cursor.execute("RELEASE SAVEPOINT load_file")
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing {csv_file.name}: {str(e)}")
+                        cursor.execute("ROLLBACK TO SAVEPOINT load_file")
+                        cursor.execute("RELEASE SAVEPOINT load_file")
                         continue
-                    
-                    logger.info(f"Loaded {len(rows)} rows from {csv_file.name}")
-                    
-                    # Insert data in batches
-                    placeholders = ', '.join(['?' for _ in headers])
-                    insert_statement = f"INSERT INTO {table_name} VALUES ({placeholders})"
-                    
-                    data_to_insert = []
-                    for row in rows:
-                        data_to_insert.append([row[col] for col in headers])
-                    
-                    cursor.executemany(insert_statement, data_to_insert)
                 
-                # Verify insertion
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                logger.info(f"Successfully inserted {count} rows into '{table_name}'")
+                conn.commit()
                 
-            except Exception as e:
-                logger.error(f"Error processing {csv_file.name}: {str(e)}")
-                conn.rollback()
-                continue
+                for i in range(len(group)):
+                    cursor.execute(f"DETACH DATABASE src{i}")
         
-        # Commit all changes
-        conn.commit()
         logger.info("All changes committed successfully")
         
+        create_indexes(cursor)
+        conn.commit()
+        
         # Print database summary
         print("\n" + "="*50)
         print("DATABASE SUMMARY")
         print("="*50)
         
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
         tables = cursor.fetchall()
         
         for table in tables: